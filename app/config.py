@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -10,6 +12,9 @@ class Settings(BaseSettings):
     app_port: int = Field(default=8080, alias="APP_PORT")
     match_confidence_threshold: float = Field(default=70.0, alias="MATCH_CONFIDENCE_THRESHOLD")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    bulk_match_track_limit: int = Field(default=50000, alias="BULK_MATCH_TRACK_LIMIT")
+    report_cache_size: int = Field(default=256, alias="REPORT_CACHE_SIZE")
+    report_cache_ttl: int = Field(default=3600, alias="REPORT_CACHE_TTL")
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -18,4 +23,9 @@ class Settings(BaseSettings):
     )
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
@@ -1,33 +1,48 @@
 import asyncio
-import csv
+import atexit
 import logging
-from io import StringIO
+import queue
+import re
+import tempfile
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import IO, Any, BinaryIO, Dict, List, Optional
 from uuid import uuid4
 
-from fastapi import Body, FastAPI, File, Form, Request, UploadFile
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from cachetools import Cache, TTLCache
+
+from fastapi import Body, Depends, FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from starlette.background import BackgroundTask
 
-from app.config import settings
+from app.config import Settings, get_settings
 from app.services.csv_loader import CSVParseError, parse_playlist_csv
 from app.services.playlist_importer import PlaylistImportError, PlaylistImporter
 from app.services.progress import progress_tracker
-from app.services.connection_tester import test_plex_connection, PlexConnectionError
-from plexapi.server import PlexServer
+from app.services.connection_tester import test_plex_connection
+from app.services.plex_client import get_plex_server, reset_plex_servers
 from app.models import ImportResult, PlaylistEntry
 
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 LOG_FILE = LOG_DIR / "importer.log"
 
+_LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
 root_logger = logging.getLogger()
 root_logger.handlers.clear()
 root_logger.setLevel(logging.DEBUG)
 
 console_handler = logging.StreamHandler()
-console_handler.setLevel(getattr(logging, settings.log_level.upper(), logging.INFO))
+console_handler.setLevel(_LOG_LEVELS.get(get_settings().log_level.upper(), logging.INFO))
 console_handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
 
 file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
@@ -36,35 +51,78 @@ file_handler.setFormatter(
     logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
 )
 
+# File writes happen on the listener thread so request handlers never block on disk I/O.
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 root_logger.addHandler(console_handler)
-root_logger.addHandler(file_handler)
+root_logger.addHandler(QueueHandler(log_queue))
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Plex CSV Playlist Importer")
+app = FastAPI(title="Plex CSV Playlist Importer", default_response_class=ORJSONResponse)
 templates = Jinja2Templates(directory="app/templates")
 
-REPORT_STORE: Dict[str, str] = {}
+
+class _ReportStore(TTLCache):
+    """TTLCache that closes report files it evicts, so disk-backed spools are removed."""
+
+    def popitem(self):
+        key, report_file = super().popitem()
+        report_file.close()
+        return key, report_file
+
+    def expire(self, time=None):
+        # TTLCache.expire drops entries without handing them back, so note what was
+        # stored beforehand and close whatever it removed.
+        stored = {key: Cache.__getitem__(self, key) for key in Cache.__iter__(self)}
+        super().expire(time)
+        for key, report_file in stored.items():
+            if not Cache.__contains__(self, key):
+                report_file.close()
+
+
+# Reports that are never downloaded expire instead of living for the process lifetime.
+REPORT_STORE: "TTLCache[str, IO[str]]" = _ReportStore(
+    maxsize=get_settings().report_cache_size,
+    ttl=get_settings().report_cache_ttl,
+)
+REPORT_STORE_LOCK = threading.Lock()
+REPORT_SPOOL_MAX_SIZE = 1 << 20
+REPORT_CHUNK_SIZE = 1 << 16
+_CSV_SPECIAL_CHARS = re.compile(r'[,"\r\n]')
+
+
+_TRUE_VALUES = frozenset({"on", "true", "1", "yes"})
 
 
 def _form_bool(value: Optional[str]) -> bool:
-    return value is not None and value.lower() in {"on", "true", "1", "yes"}
+    return value is not None and value.lower() in _TRUE_VALUES
+
+
+def _form_values(settings: Settings, **overrides: Any) -> Dict[str, Any]:
+    # Built from the injected settings so dependency overrides apply to the form too.
+    values: Dict[str, Any] = {
+        "plex_url": settings.plex_url,
+        "plex_token": settings.plex_token,
+        "music_section": settings.default_music_section,
+        "playlist_name": "",
+        "replace_existing": settings.default_replace_playlist,
+        "csv_text": "",
+    }
+    values.update(overrides)
+    return values
 
 
 @app.get("/", response_class=HTMLResponse)
-async def index(request: Request) -> HTMLResponse:
+async def index(request: Request, settings: Settings = Depends(get_settings)) -> HTMLResponse:
     context = {
         "request": request,
         "defaults": settings,
         "error": None,
-        "form_values": {
-            "plex_url": settings.plex_url,
-            "plex_token": settings.plex_token,
-            "music_section": settings.default_music_section,
-            "playlist_name": "",
-            "replace_existing": settings.default_replace_playlist,
-            "csv_text": "",
-        },
+        "form_values": _form_values(settings),
     }
     return templates.TemplateResponse("index.html", context)
 
@@ -80,10 +138,13 @@ async def import_playlist(
     csv_text: str = Form(""),
     csv_file: Optional[UploadFile] = File(None),
     job_id: str = Form(""),
+    settings: Settings = Depends(get_settings),
 ) -> HTMLResponse:
     replace_flag = _form_bool(replace_existing)
     active_playlist_name = playlist_name.strip()
     csv_text_value = csv_text
+    target_plex_url = plex_url or settings.plex_url
+    target_plex_token = plex_token or settings.plex_token
 
     logger.info(
         "Received import request for playlist '%s' targeting section '%s'",
@@ -99,34 +160,39 @@ async def import_playlist(
                 "request": request,
                 "defaults": settings,
                 "error": "Please provide CSV text or upload a CSV file.",
-                "form_values": {
-                    "plex_url": plex_url or settings.plex_url,
-                    "plex_token": plex_token,
-                    "music_section": music_section,
-                    "playlist_name": playlist_name,
-                    "replace_existing": replace_flag,
-                    "csv_text": csv_text_value,
-                },
+                "form_values": _form_values(
+                    settings,
+                    plex_url=target_plex_url,
+                    plex_token=plex_token,
+                    music_section=music_section,
+                    playlist_name=playlist_name,
+                    replace_existing=replace_flag,
+                    csv_text=csv_text_value,
+                ),
             },
             status_code=400,
         )
 
-    csv_bytes: Optional[bytes] = None
+    csv_stream: Optional[BinaryIO] = None
     if csv_file and csv_file.filename:
-        csv_bytes = await csv_file.read()
+        csv_stream = csv_file.file
+        csv_stream.seek(0)
 
     job_id = job_id.strip()
     if job_id:
         progress_tracker.start(job_id, 0)
 
+    # Probe Plex (with fallbacks) in the background while the CSV is parsed, both off
+    # the event loop. A CSV error is returned without waiting for the probe.
+    logger.info("Testing connection to Plex server before import: %s", target_plex_url)
+    probe_task = asyncio.create_task(asyncio.to_thread(test_plex_connection, target_plex_url, target_plex_token))
     try:
-        playlist_payload = parse_playlist_csv(
-            csv_text=csv_text_value,
-            csv_bytes=csv_bytes,
+        playlist_payload = await asyncio.to_thread(
+            parse_playlist_csv, csv_text=csv_text_value, csv_stream=csv_stream
         )
-        csv_text_value = playlist_payload.normalized_csv
     except CSVParseError as exc:
-        logger.exception("CSV parsing failed: %s", exc)
+        probe_task.cancel()
+        logger.error("CSV parsing failed: %s", exc, exc_info=True)
         if job_id:
             progress_tracker.error(job_id)
             progress_tracker.pop(job_id)
@@ -136,17 +202,27 @@ async def import_playlist(
                 "request": request,
                 "defaults": settings,
                 "error": str(exc),
-                "form_values": {
-                    "plex_url": plex_url or settings.plex_url,
-                    "plex_token": plex_token,
-                    "music_section": music_section,
-                    "playlist_name": playlist_name,
-                    "replace_existing": replace_flag,
-                    "csv_text": csv_text_value,
-                },
+                "form_values": _form_values(
+                    settings,
+                    plex_url=target_plex_url,
+                    plex_token=plex_token,
+                    music_section=music_section,
+                    playlist_name=playlist_name,
+                    replace_existing=replace_flag,
+                    csv_text=csv_text_value,
+                ),
             },
             status_code=400,
         )
+    except BaseException:
+        probe_task.cancel()
+        raise
+    finally:
+        if csv_file:
+            await csv_file.close()
+
+    csv_text_value = playlist_payload.normalized_csv
+    success, working_url, connection_error = await probe_task
 
     if not active_playlist_name:
         active_playlist_name = "Imported Playlist"
@@ -159,18 +235,12 @@ async def import_playlist(
     logger.info("Importing against Plex library section '%s'", music_section)
 
     def progress_callback(processed: int) -> None:
+        # The importer already throttles these calls.
         if job_id:
             progress_tracker.update(job_id, processed)
 
-    # Test connection with fallbacks before creating the importer
-    target_plex_url = plex_url or settings.plex_url
-    target_plex_token = plex_token or settings.plex_token
-
-    logger.info(f"Testing connection to Plex server before import: {target_plex_url}")
-    success, working_url, connection_error = test_plex_connection(target_plex_url, target_plex_token)
-
     if not success:
-        logger.error(f"Plex connection failed: {connection_error}")
+        logger.error("Plex connection failed: %s", connection_error)
         if job_id:
             progress_tracker.error(job_id)
             progress_tracker.pop(job_id)
@@ -183,27 +253,29 @@ async def import_playlist(
                 "defaults": settings,
                 "error": f"{connection_error}\n\nTroubleshooting steps:\n" +
                         "\n".join(f"• {step}" for step in connection_error.troubleshooting_steps),
-                "form_values": {
-                    "plex_url": plex_url or settings.plex_url,
-                    "plex_token": plex_token,
-                    "music_section": music_section,
-                    "playlist_name": playlist_name,
-                    "replace_existing": replace_flag,
-                    "csv_text": csv_text_value,
-                },
+                "form_values": _form_values(
+                    settings,
+                    plex_url=target_plex_url,
+                    plex_token=plex_token,
+                    music_section=music_section,
+                    playlist_name=playlist_name,
+                    replace_existing=replace_flag,
+                    csv_text=csv_text_value,
+                ),
             },
             status_code=502,
         )
 
     # Use the working URL (might be different from original if fallback was used)
     if working_url != target_plex_url:
-        logger.info(f"Using fallback URL for import: {working_url}")
+        logger.info("Using fallback URL for import: %s", working_url)
 
     importer = PlaylistImporter(
         plex_url=working_url,
         plex_token=target_plex_token,
         music_section=music_section,
         match_threshold=settings.match_confidence_threshold,
+        bulk_match_track_limit=settings.bulk_match_track_limit,
     )
 
     try:
@@ -224,14 +296,15 @@ async def import_playlist(
                 "request": request,
                 "defaults": settings,
                 "error": str(exc),
-                "form_values": {
-                    "plex_url": plex_url or settings.plex_url,
-                    "plex_token": plex_token,
-                    "music_section": music_section,
-                    "playlist_name": active_playlist_name,
-                    "replace_existing": replace_flag,
-                    "csv_text": csv_text_value,
-                },
+                "form_values": _form_values(
+                    settings,
+                    plex_url=target_plex_url,
+                    plex_token=plex_token,
+                    music_section=music_section,
+                    playlist_name=active_playlist_name,
+                    replace_existing=replace_flag,
+                    csv_text=csv_text_value,
+                ),
             },
             status_code=502,
         )
@@ -256,7 +329,7 @@ async def import_playlist(
         "playlist_name": active_playlist_name,
         "plex_url": importer.plex_url,
     }
-    report_token = _store_report(result, playlist_payload.entries)
+    report_token = await asyncio.to_thread(_store_report, result, playlist_payload.entries)
     context["report_token"] = report_token
     response = templates.TemplateResponse("result.html", context)
     if job_id:
@@ -268,52 +341,84 @@ async def import_playlist(
 async def preview_playlist(
     csv_text: str = Form(""),
     csv_file: Optional[UploadFile] = File(None),
-) -> JSONResponse:
-    csv_bytes: Optional[bytes] = None
+) -> ORJSONResponse:
+    csv_stream: Optional[BinaryIO] = None
     if csv_file and csv_file.filename:
-        csv_bytes = await csv_file.read()
+        csv_stream = csv_file.file
+        csv_stream.seek(0)
+
+    if csv_stream is None:
+        # Reject input that cannot hold a header plus a track row without parsing it.
+        stripped_text = csv_text.strip()
+        if not stripped_text:
+            return ORJSONResponse({"error": "Please provide CSV text or upload a CSV file."}, status_code=400)
+        if "\n" not in stripped_text:
+            return ORJSONResponse(
+                {"error": "The CSV needs a header row and at least one track row."},
+                status_code=400,
+            )
 
     try:
         playlist_payload = parse_playlist_csv(
             csv_text=csv_text,
-            csv_bytes=csv_bytes,
+            csv_stream=csv_stream,
         )
     except CSVParseError as exc:
         logger.exception("CSV preview failed: %s", exc)
-        return JSONResponse({"error": str(exc)}, status_code=400)
+        return ORJSONResponse({"error": str(exc)}, status_code=400)
+    finally:
+        if csv_file:
+            await csv_file.close()
 
     response_body: Dict[str, Any] = {
         "csv": playlist_payload.normalized_csv,
         "entryCount": len(playlist_payload.entries),
     }
-    return JSONResponse(response_body)
+    return ORJSONResponse(response_body)
 
 
 @app.get("/progress/{job_id}")
-async def get_progress(job_id: str) -> JSONResponse:
-    snapshot = progress_tracker.snapshot(job_id)
+async def get_progress(job_id: str) -> Response:
+    snapshot = progress_tracker.snapshot_json(job_id)
     if snapshot is None:
-        return JSONResponse({"status": "unknown"}, status_code=404)
-    status = snapshot.get("status")
+        return ORJSONResponse({"status": "unknown"}, status_code=404)
+    status, payload = snapshot
     if status in {"completed", "error"}:
         progress_tracker.pop(job_id)
-    return JSONResponse(snapshot)
+    # The tracker hands back pre-encoded JSON, so skip re-serialising it.
+    return Response(content=payload, media_type="application/json")
+
+
+def _music_sections(plex_url: str, plex_token: str) -> List[Dict[str, Any]]:
+    plex = get_plex_server(plex_url, plex_token)
+    sections = []
+    for section in plex.library.sections():
+        section_type = getattr(section, "type", "")
+        if section_type == "artist":
+            sections.append({
+                "key": section.key,
+                "title": section.title,
+            })
+    return sections
 
 
 @app.post("/libraries")
-async def fetch_music_libraries(payload: Dict[str, str] = Body(default={})):  # type: ignore[assignment]
+async def fetch_music_libraries(
+    payload: Dict[str, str] = Body(default={}),  # type: ignore[assignment]
+    settings: Settings = Depends(get_settings),
+):
     plex_url = payload.get("plex_url") or settings.plex_url
     plex_token = payload.get("plex_token") or settings.plex_token
 
     if not plex_token:
-        return JSONResponse({"error": "Plex token is required to list libraries."}, status_code=400)
+        return ORJSONResponse({"error": "Plex token is required to list libraries."}, status_code=400)
 
     # Test connection with fallbacks before attempting to use PlexAPI
-    logger.info(f"Testing connection to Plex server: {plex_url}")
-    success, working_url, connection_error = test_plex_connection(plex_url, plex_token)
+    logger.info("Testing connection to Plex server: %s", plex_url)
+    success, working_url, connection_error = await asyncio.to_thread(test_plex_connection, plex_url, plex_token)
 
     if not success:
-        logger.error(f"Plex connection failed: {connection_error}")
+        logger.error("Plex connection failed: %s", connection_error)
 
         # Return detailed error with troubleshooting steps
         error_response = {
@@ -321,24 +426,17 @@ async def fetch_music_libraries(payload: Dict[str, str] = Body(default={})):  #
             "troubleshooting": connection_error.troubleshooting_steps,
             "details": "Connection test failed - see troubleshooting steps"
         }
-        return JSONResponse(error_response, status_code=502)
+        return ORJSONResponse(error_response, status_code=502)
 
     # Use the working URL (might be different from original if fallback was used)
     if working_url != plex_url:
-        logger.info(f"Using fallback URL: {working_url}")
+        logger.info("Using fallback URL: %s", working_url)
 
     try:
-        plex = PlexServer(working_url, plex_token)
-        sections = []
-        for section in plex.library.sections():
-            section_type = getattr(section, "type", "")
-            if section_type == "artist":
-                sections.append({
-                    "key": section.key,
-                    "title": section.title,
-                })
+        # Connecting and listing sections are blocking HTTP calls; keep them off the event loop.
+        sections = await asyncio.to_thread(_music_sections, working_url, plex_token)
         if not sections:
-            return JSONResponse({"sections": [], "message": "No music libraries found."})
+            return ORJSONResponse({"sections": [], "message": "No music libraries found."})
 
         response = {"sections": sections}
 
@@ -347,27 +445,35 @@ async def fetch_music_libraries(payload: Dict[str, str] = Body(default={})):  #
             response["suggested_url"] = working_url
             response["message"] = f"Connected using fallback URL: {working_url}"
 
-        return JSONResponse(response)
+        return ORJSONResponse(response)
 
     except Exception as exc:
         logger.exception("Failed to fetch Plex libraries: %s", exc)
-        return JSONResponse({
+        return ORJSONResponse({
             "error": "Unable to retrieve music libraries after successful connection test.",
             "details": str(exc)
         }, status_code=502)
 
 
+@app.post("/plex/reset")
+async def reset_plex_connections() -> ORJSONResponse:
+    reset_plex_servers()
+    return ORJSONResponse({"status": "ok"})
+
+
 @app.get("/report/{token}")
 async def download_report(token: str) -> Response:
-    csv_data = REPORT_STORE.pop(token, None)
-    if not csv_data:
-        return JSONResponse({"error": "Report expired or not found."}, status_code=404)
-    return Response(
-        content=csv_data,
+    with REPORT_STORE_LOCK:
+        report_file = REPORT_STORE.pop(token, None)
+    if report_file is None:
+        return ORJSONResponse({"error": "Report expired or not found."}, status_code=404)
+    return StreamingResponse(
+        iter(lambda: report_file.read(REPORT_CHUNK_SIZE), ""),
         media_type="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename=import-report-{token}.csv"
         },
+        background=BackgroundTask(report_file.close),
     )
 
 
@@ -376,20 +482,35 @@ def _store_report(result: ImportResult, entries: List[PlaylistEntry]) -> str:
         item.row: item.reason or "No confident match found."
         for item in result.unmatched
     }
+    status_for = unmatched_map.get
+    default_status = "Imported ok"
+
+    rows = ["Artist,Album,Track,Status"]
+    rows.extend(
+        ",".join((
+            _csv_escape(entry.artist_name),
+            _csv_escape(entry.album_name or ""),
+            _csv_escape(entry.track_name),
+            _csv_escape(status_for(entry.row, default_status)),
+        ))
+        for entry in entries
+    )
 
-    buffer = StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(["Artist", "Album", "Track", "Status"])
-
-    for entry in entries:
-        status = unmatched_map.get(entry.row, "Imported ok")
-        writer.writerow([
-            entry.artist_name,
-            entry.album_name or "",
-            entry.track_name,
-            status,
-        ])
+    # Large reports spill to disk so pending downloads don't stay resident in memory.
+    report_file = tempfile.SpooledTemporaryFile(
+        max_size=REPORT_SPOOL_MAX_SIZE, mode="w+", encoding="utf-8", newline=""
+    )
+    report_file.write("\r\n".join(rows) + "\r\n")
+    report_file.seek(0)
 
     token = uuid4().hex
-    REPORT_STORE[token] = buffer.getvalue()
+    with REPORT_STORE_LOCK:
+        REPORT_STORE[token] = report_file
     return token
+
+
+def _csv_escape(value: str) -> str:
+    # Same quoting rules as csv.writer's QUOTE_MINIMAL for the default dialect.
+    if _CSV_SPECIAL_CHARS.search(value) is not None:
+        return '"' + value.replace('"', '""') + '"'
+    return value
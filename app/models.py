@@ -1,19 +1,23 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from typing import List, Optional
 
 from pydantic import BaseModel
 
 
-class PlaylistEntry(BaseModel):
+# Plain slotted dataclass: entries are created per CSV row and never cross the API
+# boundary on their own, so they skip BaseModel's per-instance validation overhead.
+@dataclass(slots=True)
+class PlaylistEntry:
     row: int
     track_name: str
     artist_name: str
     album_name: Optional[str] = None
+    combined_key: str = field(init=False, repr=False, compare=False)
 
-    @property
-    def combined_key(self) -> str:
-        return f"{self.artist_name} - {self.track_name}".strip()
+    def __post_init__(self) -> None:
+        self.combined_key = f"{self.artist_name} - {self.track_name}".strip()
 
 
 class PlaylistPayload(BaseModel):
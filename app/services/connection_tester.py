@@ -5,13 +5,22 @@ Provides robust connection testing and helpful error messages.
 
 import socket
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple
 from urllib.parse import urlparse
 import subprocess
 
+try:
+    import psutil
+except ImportError:  # psutil is optional; fall back to parsing ifconfig
+    psutil = None
+
 
 logger = logging.getLogger(__name__)
 
+# Fallbacks are probed in parallel, so a short per-probe timeout costs nothing.
+FALLBACK_PROBE_TIMEOUT = 2
+
 
 class PlexConnectionError(Exception):
     """Raised when Plex connection fails with troubleshooting guidance"""
@@ -27,7 +36,7 @@ class PlexConnectionTester:
     def __init__(self, timeout: int = 10):
         self.timeout = timeout
 
-    def test_connection(self, plex_url: str) -> bool:
+    def test_connection(self, plex_url: str, timeout: Optional[float] = None) -> bool:
         """
         Test if the given Plex URL is reachable via Python.
         Returns True if successful, False otherwise.
@@ -37,9 +46,9 @@ class PlexConnectionTester:
             host = parsed.hostname
             port = parsed.port or 32400
 
-            return self._test_socket_connection(host, port)
+            return self._test_socket_connection(host, port, timeout)
         except Exception as e:
-            logger.debug(f"Connection test failed: {e}")
+            logger.debug("Connection test failed: %s", e)
             return False
 
     def test_with_fallbacks(self, plex_url: str) -> Tuple[bool, Optional[str]]:
@@ -61,12 +70,24 @@ class PlexConnectionTester:
 
         # Generate fallback URLs to test
         fallback_hosts = self._generate_fallback_hosts(original_host)
+        fallback_urls = list(dict.fromkeys(f"http://{host}:{port}" for host in fallback_hosts))
+        if not fallback_urls:
+            return False, None
 
-        for host in fallback_hosts:
-            fallback_url = f"http://{host}:{port}"
-            if self.test_connection(fallback_url):
-                logger.info(f"Found working fallback URL: {fallback_url}")
-                return True, fallback_url
+        # Probe all fallbacks at once with a short timeout, but check the results in
+        # priority order so the same reachable host wins every time.
+        executor = ThreadPoolExecutor(max_workers=len(fallback_urls))
+        try:
+            futures = [
+                (executor.submit(self.test_connection, url, FALLBACK_PROBE_TIMEOUT), url)
+                for url in fallback_urls
+            ]
+            for future, fallback_url in futures:
+                if future.result():
+                    logger.info("Found working fallback URL: %s", fallback_url)
+                    return True, fallback_url
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
         return False, None
 
@@ -111,11 +132,11 @@ class PlexConnectionTester:
 
         return PlexConnectionError(message, troubleshooting_steps)
 
-    def _test_socket_connection(self, host: str, port: int) -> bool:
+    def _test_socket_connection(self, host: str, port: int, timeout: Optional[float] = None) -> bool:
         """Test raw socket connection"""
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(self.timeout)
+            sock.settimeout(self.timeout if timeout is None else timeout)
             result = sock.connect_ex((host, port))
             sock.close()
             return result == 0
@@ -184,23 +205,32 @@ class PlexConnectionTester:
 
     def _get_local_ips(self) -> List[str]:
         """Get local machine IP addresses"""
-        ips = []
-        try:
-            result = subprocess.run(['ifconfig'], capture_output=True, text=True)
-            lines = result.stdout.split('\n')
+        return get_local_ips()
 
-            for line in lines:
+
+def get_local_ips() -> List[str]:
+    """Local IPv4 addresses, excluding loopback.
+
+    Reads the interfaces in-process when psutil is installed and otherwise
+    parses ``ifconfig``; resolving the hostname often yields only 127.0.1.1.
+    """
+    ips = []
+    try:
+        if psutil is not None:
+            for addresses in psutil.net_if_addrs().values():
+                ips.extend(addr.address for addr in addresses if addr.family == socket.AF_INET)
+        else:
+            result = subprocess.run(['ifconfig'], capture_output=True, text=True, timeout=5)
+            for line in result.stdout.split('\n'):
                 if 'inet ' in line and 'netmask' in line:
                     parts = line.strip().split()
                     for i, part in enumerate(parts):
                         if part == 'inet' and i + 1 < len(parts):
-                            ip = parts[i + 1]
-                            if not ip.startswith('127.') and '.' in ip:
-                                ips.append(ip)
-        except:
-            pass
+                            ips.append(parts[i + 1])
+    except (OSError, subprocess.TimeoutExpired):
+        pass
 
-        return ips
+    return [ip for ip in dict.fromkeys(ips) if '.' in ip and not ip.startswith('127.')]
 
 
 def test_plex_connection(plex_url: str, plex_token: str = None) -> Tuple[bool, Optional[str], Optional[PlexConnectionError]]:
@@ -3,9 +3,7 @@ from __future__ import annotations
 import csv
 import io
 import logging
-from typing import Dict, List, Optional, Sequence
-
-import pandas as pd
+from typing import IO, Dict, List, Optional, Sequence
 
 from app.models import PlaylistEntry, PlaylistPayload
 
@@ -28,95 +26,135 @@ COLUMN_ALIASES: Dict[str, str] = {
 
 
 REQUIRED_COLUMNS = {"track_name", "artist_name"}
-def parse_playlist_csv(csv_text: str = "", csv_bytes: Optional[bytes] = None) -> PlaylistPayload:
-    raw_csv = _resolve_csv_payload(csv_text, csv_bytes)
-
-    try:
-        dataframe = pd.read_csv(
-            io.StringIO(raw_csv),
-            sep=None,
-            engine="python",
-            dtype=str,
-            keep_default_na=False,
-        )
-    except Exception as exc:  # pragma: no cover - pandas parses many edge cases
-        raise CSVParseError(f"Unable to parse CSV: {exc}") from exc
+SNIFF_DELIMITERS = ",;\t|"
+# Bytes inspected up front to rule out UTF-8 before a full parse is attempted.
+ENCODING_PROBE_BYTES = 64 * 1024
+def parse_playlist_csv(
+    csv_text: str = "",
+    csv_bytes: Optional[bytes] = None,
+    csv_stream: Optional[IO[bytes]] = None,
+) -> PlaylistPayload:
+    candidate = csv_text.strip()
+    if candidate:
+        return _parse_rows(io.StringIO(candidate))
 
-    if dataframe.empty:
-        raise CSVParseError("The CSV file is empty.")
+    if csv_stream is None and csv_bytes is not None:
+        csv_stream = io.BytesIO(csv_bytes)
+    if csv_stream is None:
+        raise CSVParseError("No CSV content provided.")
 
-    normalized = {_normalize(col): col for col in dataframe.columns}
-    column_map: Dict[str, str] = {}
-    for friendly, internal in COLUMN_ALIASES.items():
-        if friendly in normalized:
-            column_map[internal] = normalized[friendly]
-
-    missing = REQUIRED_COLUMNS - column_map.keys()
-    if missing:
-        pretty = ", ".join(sorted(missing))
-        raise CSVParseError(f"Missing required columns: {pretty}.")
-
-    rows = dataframe.to_dict(orient="records")
-    parsed_entries: List[PlaylistEntry] = []
-
-    for display_index, row in enumerate(rows, start=2):
-        track_name = _clean_cell(row.get(column_map["track_name"]))
-        artist_name = _clean_cell(row.get(column_map["artist_name"]))
-        if not track_name or not artist_name:
-            logger.debug(
-                "Skipping row %s due to missing track/artist: track='%s' artist='%s'",
-                display_index,
-                track_name,
-                artist_name,
-            )
+    # Decode the upload incrementally instead of materialising it as one string;
+    # the stream is rewound for each encoding attempt.
+    for encoding in _candidate_encodings(csv_stream):
+        csv_stream.seek(0)
+        text_stream = io.TextIOWrapper(csv_stream, encoding=encoding, newline="")
+        try:
+            return _parse_rows(text_stream)
+        except UnicodeDecodeError:
             continue
+        finally:
+            # Detach so closing the wrapper never closes the caller's stream.
+            text_stream.detach()
+    raise CSVParseError("Unable to decode CSV. Please use UTF-8 or Latin-1 encoding.")
+
+
+def _candidate_encodings(stream: IO[bytes]) -> Sequence[str]:
+    # utf-8-sig also reads BOM-less UTF-8, and latin-1 accepts any byte, so at
+    # most two passes are needed. When the head of the file is already invalid
+    # UTF-8 the full UTF-8 parse is skipped altogether.
+    stream.seek(0)
+    head = stream.read(ENCODING_PROBE_BYTES)
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # A multi-byte sequence cut off by the probe boundary proves nothing.
+        if exc.reason != "unexpected end of data":
+            return ("latin-1",)
+    return ("utf-8-sig", "latin-1")
 
-        album_name = _clean_cell(row.get(column_map.get("album_name", ""))) if "album_name" in column_map else None
 
-        parsed_entries.append(
-            PlaylistEntry(
-                row=display_index,
-                track_name=track_name,
-                artist_name=artist_name,
-                album_name=album_name or None,
+def _parse_rows(source: IO[str]) -> PlaylistPayload:
+    header_line = source.readline()
+    source.seek(0)
+    # Blank lines are skipped and do not count towards display row numbers.
+    rows = (row for row in csv.reader(source, delimiter=_sniff_delimiter(header_line)) if row)
+
+    try:
+        header = next(rows, None)
+        if header is None:
+            raise CSVParseError("The CSV file is empty.")
+
+        normalized = {_normalize(col): index for index, col in enumerate(header)}
+        column_map: Dict[str, int] = {}
+        for friendly, internal in COLUMN_ALIASES.items():
+            if friendly in normalized:
+                column_map[internal] = normalized[friendly]
+
+        missing = REQUIRED_COLUMNS - column_map.keys()
+        if missing:
+            pretty = ", ".join(sorted(missing))
+            raise CSVParseError(f"Missing required columns: {pretty}.")
+
+        track_index = column_map["track_name"]
+        artist_index = column_map["artist_name"]
+        album_index = column_map.get("album_name")
+        parsed_entries: List[PlaylistEntry] = []
+        row_count = 0
+
+        for display_index, row in enumerate(rows, start=2):
+            row_count += 1
+            track_name = _clean_cell(row, track_index)
+            artist_name = _clean_cell(row, artist_index)
+            if not track_name or not artist_name:
+                logger.debug(
+                    "Skipping row %s due to missing track/artist: track='%s' artist='%s'",
+                    display_index,
+                    track_name,
+                    artist_name,
+                )
+                continue
+
+            album_name = _clean_cell(row, album_index) if album_index is not None else None
+
+            parsed_entries.append(
+                PlaylistEntry(
+                    row=display_index,
+                    track_name=track_name,
+                    artist_name=artist_name,
+                    album_name=album_name or None,
+                )
             )
-        )
+    except csv.Error as exc:
+        raise CSVParseError(f"Unable to parse CSV: {exc}") from exc
 
+    if not row_count:
+        raise CSVParseError("The CSV file is empty.")
     if not parsed_entries:
         raise CSVParseError("No valid tracks found in the CSV.")
 
     entries = parsed_entries
     normalized_csv = _serialize_entries(entries)
 
-    logger.info("Parsed %s rows into %s playlist entries", len(rows), len(entries))
+    logger.info("Parsed %s rows into %s playlist entries", row_count, len(entries))
     return PlaylistPayload(entries=entries, normalized_csv=normalized_csv)
 
 
-def _resolve_csv_payload(csv_text: str, csv_bytes: Optional[bytes]) -> str:
-    candidate = csv_text.strip()
-    if candidate:
-        return candidate
-
-    if csv_bytes is None:
-        raise CSVParseError("No CSV content provided.")
-
-    for encoding in ("utf-8-sig", "utf-8", "latin-1"):
-        try:
-            return csv_bytes.decode(encoding)
-        except UnicodeDecodeError:
-            continue
-    raise CSVParseError("Unable to decode CSV. Please use UTF-8 or Latin-1 encoding.")
+def _sniff_delimiter(header_line: str) -> str:
+    # Only the header is sniffed; data rows may contain other delimiter-like characters.
+    try:
+        return csv.Sniffer().sniff(header_line, delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
 
 
 def _normalize(column_name: str) -> str:
     return column_name.strip().lower().replace("_", " ")
 
 
-def _clean_cell(value: Optional[str]) -> str:
-    if value is None:
+def _clean_cell(row: Sequence[str], index: int) -> str:
+    if index >= len(row):
         return ""
-    text = str(value).strip()
-    return text
+    return row[index].strip()
 
 
 def _serialize_entries(entries: Sequence[PlaylistEntry]) -> str:
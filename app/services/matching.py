@@ -2,10 +2,14 @@ from __future__ import annotations
 
 import logging
 import re
+import sys
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional, Set
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 from unidecode import unidecode
 
 from app.models import PlaylistEntry
@@ -28,6 +32,22 @@ STOP_WORDS = {
     "edition",
     "explicit",
 }
+SEARCH_CACHE_SIZE = 4096
+# Library matches are re-scored with the album blend from this many WRatio leaders.
+LIBRARY_SHORTLIST_SIZE = 10
+
+# REMOVALS and STOP_WORDS applied in one pass; longer stop words come first so
+# "remastered" is not left as "ed" by the shorter "remaster".
+_NOISE_RE = re.compile(
+    "|".join(REMOVALS + tuple(re.escape(word) for word in sorted(STOP_WORDS, key=len, reverse=True)))
+)
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_PAREN_RE = re.compile(r"\s*\(.*?\)")
+_DASH_RE = re.compile(r"\s+-\s+")
+_FEAT_RE = re.compile(r"\s*(feat\.|featuring)\b.*", re.IGNORECASE)
+# Latin-1 Supplement and Latin Extended-A cover nearly all accented metadata; their
+# transliterations are taken from unidecode so the fast path gives identical keys.
+_ACCENT_TABLE = str.maketrans({chr(code): unidecode(chr(code)) for code in range(0xA0, 0x180)})
 
 
 @dataclass
@@ -43,10 +63,33 @@ class MatchAttempt:
     had_candidates: bool
 
 
+@dataclass
+class LibraryIndex:
+    """A section's playable tracks with their precomputed match keys."""
+
+    tracks: List[Any]
+    keys: List[str]
+
+    @classmethod
+    def build(cls, tracks: Iterable[Any]) -> "LibraryIndex":
+        playable = _playable_tracks(tracks)
+        return cls(tracks=playable, keys=[_candidate_keys(track)[0] for track in playable])
+
+
 class TrackMatcher:
-    def __init__(self, section: Any, threshold: float = 70.0) -> None:
+    def __init__(self, section: Any, threshold: float = 70.0, library: Optional[LibraryIndex] = None) -> None:
         self.section = section
         self.threshold = threshold
+        self._search_cache: "OrderedDict[Tuple[Any, ...], List[Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # With the whole track list indexed up front, entries are matched in memory
+        # instead of issuing several Plex searches each.
+        self._library = library
+
+    @staticmethod
+    def count_queries(entries: Iterable[PlaylistEntry]) -> int:
+        """Number of primary Plex searches matching these entries would issue without an index."""
+        return sum(len(TrackMatcher._build_queries(entry)) for entry in entries)
 
     def find_best_match(self, entry: PlaylistEntry) -> MatchAttempt:
         logger.debug(
@@ -55,31 +98,39 @@ class TrackMatcher:
             entry.artist_name,
             entry.row,
         )
+        if self._library is not None:
+            return self._match_from_library(entry, self._library)
+
         queries = self._build_queries(entry)
         best: Optional[MatchResult] = None
         seen_keys: Set[str] = set()
         had_candidates = False
         best_score_seen = 0.0
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
         for query in queries:
             candidates = list(self._search_candidates(query))
             if candidates:
                 had_candidates = True
             logger.debug("Query %s returned %s candidates", query, len(candidates))
+            fresh_candidates = []
             for candidate in candidates:
                 rating_key = getattr(candidate, "ratingKey", None)
                 if rating_key in seen_keys:
                     continue
                 seen_keys.add(rating_key)
+                fresh_candidates.append(candidate)
 
-                score = self._score_candidate(entry, candidate)
+            scores = self._score_candidates(entry, fresh_candidates)
+            for candidate, score in zip(fresh_candidates, scores):
                 best_score_seen = max(best_score_seen, score)
-                logger.debug(
-                    "Candidate title='%s' artist='%s' score=%.2f",
-                    getattr(candidate, "title", "<unknown>"),
-                    getattr(candidate, "grandparentTitle", "") or getattr(candidate, "artist", ""),
-                    score,
-                )
+                if debug_enabled:
+                    logger.debug(
+                        "Candidate title='%s' artist='%s' score=%.2f",
+                        getattr(candidate, "title", "<unknown>"),
+                        getattr(candidate, "grandparentTitle", "") or getattr(candidate, "artist", ""),
+                        score,
+                    )
                 if score >= self.threshold and (best is None or score > best.score):
                     best = MatchResult(track=candidate, score=score)
                     if score == 100:
@@ -91,8 +142,28 @@ class TrackMatcher:
                 logger.debug("No candidates met threshold %.2f", self.threshold)
         return MatchAttempt(result=best, best_score=best_score_seen, had_candidates=had_candidates)
 
-    def _build_queries(self, entry: PlaylistEntry) -> List[Dict[str, Any]]:
-        title_variants = self._title_variants(entry.track_name)
+    def _match_from_library(self, entry: PlaylistEntry, library: LibraryIndex) -> MatchAttempt:
+        shortlist = process.extract(
+            normalize_key(entry.combined_key),
+            library.keys,
+            scorer=fuzz.WRatio,
+            limit=LIBRARY_SHORTLIST_SIZE,
+        )
+        candidates = [library.tracks[index] for _, _, index in shortlist]
+        scores = self._score_candidates(entry, candidates)
+
+        best: Optional[MatchResult] = None
+        for candidate, score in zip(candidates, scores):
+            if score >= self.threshold and (best is None or score > best.score):
+                best = MatchResult(track=candidate, score=score)
+        best_score_seen = max(scores, default=0.0)
+        if best is None:
+            logger.debug("Best library score %.2f below threshold %.2f", best_score_seen, self.threshold)
+        return MatchAttempt(result=best, best_score=best_score_seen, had_candidates=bool(candidates))
+
+    @staticmethod
+    def _build_queries(entry: PlaylistEntry) -> List[Dict[str, Any]]:
+        title_variants = TrackMatcher._title_variants(entry.track_name)
         artist = entry.artist_name.strip()
         album = entry.album_name.strip() if entry.album_name else None
 
@@ -114,20 +185,11 @@ class TrackMatcher:
         if not title:
             return []
 
-        try:
-            results = self.section.searchTracks(**search_kwargs)
-        except Exception as exc:
-            logger.debug("searchTracks error for %s: %s", search_kwargs, exc)
-            results = []
-
-        filtered = [
-            item
-            for item in results
-            if getattr(item, "title", "")
-            and getattr(item, "ratingKey", None) is not None
-            and getattr(item, "TYPE", getattr(item, "type", "")) == "track"
-        ]
-
+        filtered = self._cached_search(
+            ("searchTracks",) + tuple(sorted(search_kwargs.items())),
+            self._search_tracks,
+            search_kwargs,
+        )
         if filtered:
             return filtered
 
@@ -135,19 +197,7 @@ class TrackMatcher:
         if not fallback_query:
             fallback_query = title
 
-        try:
-            fallback_results = self.section.search(fallback_query, libtype="track")
-        except Exception as exc:
-            logger.debug("Fallback search error for '%s': %s", fallback_query, exc)
-            return []
-
-        fallback_filtered = [
-            item
-            for item in fallback_results
-            if getattr(item, "title", "")
-            and getattr(item, "ratingKey", None) is not None
-            and getattr(item, "TYPE", getattr(item, "type", "")) == "track"
-        ]
+        fallback_filtered = self._cached_search(("search", fallback_query), self._search_fallback, fallback_query)
         if fallback_filtered:
             logger.debug(
                 "Fallback search for '%s' returned %s candidates",
@@ -156,22 +206,70 @@ class TrackMatcher:
             )
         return fallback_filtered
 
-    def _score_candidate(self, entry: PlaylistEntry, candidate: Any) -> float:
-        entry_key = normalize_key(entry.combined_key)
-        candidate_title = getattr(candidate, "title", "")
-        candidate_artist = getattr(candidate, "grandparentTitle", "") or getattr(candidate, "artist", "")
-        candidate_album = getattr(candidate, "parentTitle", "")
+    def _cached_search(
+        self,
+        cache_key: Tuple[Any, ...],
+        search: Callable[[Any], Optional[List[Any]]],
+        arg: Any,
+    ) -> List[Any]:
+        # Playlists repeat artists/albums, so identical searches are common; failed
+        # searches (None) are not cached so a transient error can be retried.
+        with self._cache_lock:
+            cached = self._search_cache.get(cache_key)
+            if cached is not None:
+                self._search_cache.move_to_end(cache_key)
+                return cached
+
+        results = search(arg)
+        if results is None:
+            return []
+
+        with self._cache_lock:
+            self._search_cache[cache_key] = results
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return results
+
+    def _search_tracks(self, search_kwargs: Dict[str, Any]) -> Optional[List[Any]]:
+        try:
+            results = self.section.searchTracks(**search_kwargs)
+        except Exception as exc:
+            logger.debug("searchTracks error for %s: %s", search_kwargs, exc)
+            return None
+        return _playable_tracks(results)
+
+    def _search_fallback(self, fallback_query: str) -> Optional[List[Any]]:
+        try:
+            results = self.section.search(fallback_query, libtype="track")
+        except Exception as exc:
+            logger.debug("Fallback search error for '%s': %s", fallback_query, exc)
+            return None
+        return _playable_tracks(results)
+
+    def _score_candidates(self, entry: PlaylistEntry, candidates: List[Any]) -> List[float]:
+        if not candidates:
+            return []
+
+        candidate_keys: List[str] = []
+        album_keys: List[Optional[str]] = []
+        for candidate in candidates:
+            candidate_key, album_key = _candidate_keys(candidate)
+            candidate_keys.append(candidate_key)
+            album_keys.append(album_key)
 
-        candidate_key = normalize_key(f"{candidate_artist} - {candidate_title}")
-        base_score = fuzz.WRatio(entry_key, candidate_key)
+        # Score the whole candidate list per scorer in one C-level call.
+        scores = _batch_scores(normalize_key(entry.combined_key), candidate_keys, fuzz.WRatio)
 
-        if entry.album_name and candidate_album:
-            album_score = fuzz.partial_ratio(normalize_key(entry.album_name), normalize_key(candidate_album))
-            base_score = (base_score * 0.7) + (album_score * 0.3)
+        if entry.album_name:
+            album_scores = _batch_scores(normalize_key(entry.album_name), album_keys, fuzz.partial_ratio)
+            for index, album_key in enumerate(album_keys):
+                if album_key is not None:
+                    scores[index] = (scores[index] * 0.7) + (album_scores[index] * 0.3)
 
-        return float(round(base_score, 2))
+        return [float(round(score, 2)) for score in scores]
 
-    def _title_variants(self, title: str) -> List[str]:
+    @staticmethod
+    def _title_variants(title: str) -> List[str]:
         variants: List[str] = []
         seen: Set[str] = set()
 
@@ -182,22 +280,48 @@ class TrackMatcher:
                 variants.append(candidate)
 
         _add(title)
-        stripped_parentheses = re.sub(r"\s*\(.*?\)", "", title)
+        stripped_parentheses = _PAREN_RE.sub("", title)
         _add(stripped_parentheses)
-        dashed_split = re.split(r"\s+-\s+", stripped_parentheses, maxsplit=1)[0]
+        dashed_split = _DASH_RE.split(stripped_parentheses, maxsplit=1)[0]
         _add(dashed_split)
-        feat_removed = re.sub(r"\s*(feat\.|featuring)\b.*", "", dashed_split, flags=re.IGNORECASE)
+        feat_removed = _FEAT_RE.sub("", dashed_split)
         _add(feat_removed)
 
         return variants
 
 
+def _candidate_keys(candidate: Any) -> Tuple[str, Optional[str]]:
+    candidate_title = getattr(candidate, "title", "")
+    candidate_artist = getattr(candidate, "grandparentTitle", "") or getattr(candidate, "artist", "")
+    candidate_album = getattr(candidate, "parentTitle", "")
+    album_key = normalize_key(candidate_album) if candidate_album else None
+    return normalize_key(f"{candidate_artist} - {candidate_title}"), album_key
+
+
+def _batch_scores(query: str, choices: List[Optional[str]], scorer: Callable[..., float]) -> List[float]:
+    scores = [0.0] * len(choices)
+    for _, score, index in process.extract(query, choices, scorer=scorer, limit=None):
+        scores[index] = score
+    return scores
+
+
+def _playable_tracks(results: Iterable[Any]) -> List[Any]:
+    return [
+        item
+        for item in results
+        if getattr(item, "title", "")
+        and getattr(item, "ratingKey", None) is not None
+        and getattr(item, "TYPE", getattr(item, "type", "")) == "track"
+    ]
+
+
+@lru_cache(maxsize=8192)
 def normalize_key(text: str) -> str:
-    lowered = unidecode(text or "").lower()
-    cleaned = lowered
-    for pattern in REMOVALS:
-        cleaned = re.sub(pattern, " ", cleaned)
-    for word in STOP_WORDS:
-        cleaned = cleaned.replace(word, " ")
-    cleaned = re.sub(r"[^a-z0-9]+", " ", cleaned)
-    return cleaned.strip()
+    ascii_text = (text or "").translate(_ACCENT_TABLE)
+    if not ascii_text.isascii():
+        ascii_text = unidecode(ascii_text)
+    lowered = ascii_text.lower()
+    cleaned = _NOISE_RE.sub(" ", lowered)
+    cleaned = _NON_ALNUM_RE.sub(" ", cleaned)
+    # Interned so equal keys from different candidates share one object (and its hash).
+    return sys.intern(cleaned.strip())
@@ -1,29 +1,52 @@
 from __future__ import annotations
 
 import logging
-from typing import Callable, Iterable, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Set
 
 from plexapi.exceptions import NotFound
 from plexapi.server import PlexServer
 
 from app.models import ImportResult, PlaylistEntry, UnmatchedTrack
-from app.services.matching import TrackMatcher
+from app.services.matching import LibraryIndex, TrackMatcher
+from app.services.plex_client import discard_plex_server, get_plex_server
 
 logger = logging.getLogger(__name__)
 
+# Plex searches are blocking HTTP round-trips, so entries are matched concurrently.
+MAX_MATCH_WORKERS = 8
+# Fetching roughly this many tracks costs about as much as one search round-trip;
+# the section is only indexed when the playlist would need more searches than that.
+BULK_TRACKS_PER_SEARCH = 100
+# Tracks per request when indexing a section (plexapi pages 100 at a time by default).
+LIBRARY_PAGE_SIZE = 5000
+# Minimum seconds between progress callbacks; the final entry is always reported.
+PROGRESS_REPORT_INTERVAL = 0.1
+
 
 class PlaylistImportError(Exception):
     pass
 
 
 class PlaylistImporter:
-    def __init__(self, plex_url: str, plex_token: str, music_section: str, match_threshold: float) -> None:
+    def __init__(
+        self,
+        plex_url: str,
+        plex_token: str,
+        music_section: str,
+        match_threshold: float,
+        plex: Optional[PlexServer] = None,
+        bulk_match_track_limit: int = 0,
+    ) -> None:
         if not plex_token:
             raise PlaylistImportError("Plex token is required.")
         self.plex_url = plex_url
         self.plex_token = plex_token
         self.music_section = music_section
         self.match_threshold = match_threshold
+        self.bulk_match_track_limit = bulk_match_track_limit
+        self._plex = plex
 
     def import_playlist(
         self,
@@ -32,13 +55,17 @@ class PlaylistImporter:
         replace_existing: bool,
         progress_callback: Optional[Callable[[int], None]] = None,
     ) -> ImportResult:
-        try:
-            plex = PlexServer(self.plex_url, self.plex_token)
-        except Exception as exc:
-            logger.exception("Failed to connect to Plex server at %s", self.plex_url)
-            raise PlaylistImportError(
-                f"Unable to connect to Plex server. Check URL and token. ({exc})"
-            ) from exc
+        # Without an injected server, the shared client cache keeps connections
+        # alive across requests.
+        plex = self._plex
+        if plex is None:
+            try:
+                plex = get_plex_server(self.plex_url, self.plex_token)
+            except Exception as exc:
+                logger.exception("Failed to connect to Plex server at %s", self.plex_url)
+                raise PlaylistImportError(
+                    f"Unable to connect to Plex server. Check URL and token. ({exc})"
+                ) from exc
 
         try:
             section = plex.library.section(self.music_section)
@@ -46,57 +73,77 @@ class PlaylistImporter:
             logger.exception("Music section '%s' not found", self.music_section)
             raise PlaylistImportError(f"Music section '{self.music_section}' not found. ({exc})") from exc
 
-        matcher = TrackMatcher(section=section, threshold=self.match_threshold)
+        entries = list(entries)
+        matcher = TrackMatcher(
+            section=section,
+            threshold=self.match_threshold,
+            library=self._library_index(section, TrackMatcher.count_queries(entries)),
+        )
         matched_tracks: List = []
         unmatched: List[UnmatchedTrack] = []
         seen_rating_keys = set()
         matched_count = 0
+        reported = 0
+        last_report = time.monotonic()
 
-        for index, entry in enumerate(entries, start=1):
-            attempt = matcher.find_best_match(entry)
-            match = attempt.result
-            if match and getattr(match.track, "ratingKey", None) is not None:
-                if not _has_playable_media(match.track):
-                    logger.warning(
-                        "Skipping track %s — Plex reports no playable media.",
-                        getattr(match.track, "title", "<unknown>"),
-                    )
+        def report_progress(processed: int) -> None:
+            nonlocal reported, last_report
+            reported = processed
+            last_report = time.monotonic()
+            try:
+                progress_callback(processed)
+            except Exception:  # pragma: no cover - progress is best-effort
+                logger.debug("Progress callback failed", exc_info=True)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_MATCH_WORKERS, len(entries)))) as executor:
+            # map() yields in entry order, so playlist order and duplicate handling
+            # stay identical to a sequential run while searches overlap.
+            attempts = executor.map(matcher.find_best_match, entries)
+            for index, (entry, attempt) in enumerate(zip(entries, attempts), start=1):
+                match = attempt.result
+                if match and getattr(match.track, "ratingKey", None) is not None:
+                    if not _has_playable_media(match.track):
+                        logger.warning(
+                            "Skipping track %s — Plex reports no playable media.",
+                            getattr(match.track, "title", "<unknown>"),
+                        )
+                        unmatched.append(
+                            UnmatchedTrack(
+                                row=entry.row,
+                                track_name=entry.track_name,
+                                artist_name=entry.artist_name,
+                                reason="Matched Plex track has no playable media (check library paths).",
+                            )
+                        )
+                        continue
+                    matched_count += 1
+                    rating_key = getattr(match.track, "ratingKey")
+                    if rating_key in seen_rating_keys:
+                        continue
+                    seen_rating_keys.add(rating_key)
+                    matched_tracks.append(match.track)
+                else:
+                    if attempt.had_candidates and attempt.best_score > 0:
+                        reason = (
+                            f"Best match score {attempt.best_score:.1f} < threshold {self.match_threshold:.0f}."
+                        )
+                    else:
+                        reason = "Track not found in the selected library."
                     unmatched.append(
                         UnmatchedTrack(
                             row=entry.row,
                             track_name=entry.track_name,
                             artist_name=entry.artist_name,
-                            reason="Matched Plex track has no playable media (check library paths).",
+                            reason=reason,
                         )
                     )
-                    continue
-                matched_count += 1
-                rating_key = getattr(match.track, "ratingKey")
-                if rating_key in seen_rating_keys:
-                    continue
-                seen_rating_keys.add(rating_key)
-                matched_tracks.append(match.track)
-            else:
-                if attempt.had_candidates and attempt.best_score > 0:
-                    reason = (
-                        f"Best match score {attempt.best_score:.1f} < threshold {self.match_threshold:.0f}."
-                    )
-                else:
-                    reason = "Track not found in the selected library."
-                unmatched.append(
-                    UnmatchedTrack(
-                        row=entry.row,
-                        track_name=entry.track_name,
-                        artist_name=entry.artist_name,
-                        reason=reason,
-                    )
-                )
 
-            if progress_callback:
-                try:
-                    progress_callback(index)
-                except Exception:  # pragma: no cover - progress is best-effort
-                    logger.debug("Progress callback failed", exc_info=True)
+                if progress_callback and time.monotonic() - last_report >= PROGRESS_REPORT_INTERVAL:
+                    report_progress(index)
+
+        # Skipped entries bypass the throttled report above, so settle the final count here.
+        if progress_callback and reported != len(entries):
+            report_progress(len(entries))
 
         try:
             added_count = self._apply_playlist_changes(
@@ -108,6 +155,7 @@ class PlaylistImporter:
             )
         except Exception as exc:
             logger.exception("Failed to apply playlist changes for '%s'", playlist_name)
+            self._reset_connection()
             raise PlaylistImportError(f"Failed to update playlist '{playlist_name}'. ({exc})") from exc
 
         result = ImportResult(
@@ -117,6 +165,45 @@ class PlaylistImporter:
         )
         return result
 
+    def _library_index(self, section, query_count: int) -> Optional[LibraryIndex]:
+        """Index the whole section for in-memory matching when that beats per-track searches.
+
+        The index lives only as long as the import's matcher, so every import sees
+        the library as it is now and nothing stays pinned once it finishes.
+        """
+        if self.bulk_match_track_limit <= 0:
+            return None
+        try:
+            track_count = section.totalViewSize(libtype="track")
+            if track_count > self.bulk_match_track_limit:
+                logger.info(
+                    "Section has %s tracks (limit %s); matching with per-track searches",
+                    track_count,
+                    self.bulk_match_track_limit,
+                )
+                return None
+            if query_count * BULK_TRACKS_PER_SEARCH <= track_count:
+                logger.info(
+                    "Matching %s searches directly; cheaper than indexing %s library tracks",
+                    query_count,
+                    track_count,
+                )
+                return None
+            tracks = section.searchTracks(container_size=LIBRARY_PAGE_SIZE)
+        except Exception:
+            logger.warning("Unable to fetch the full track list; matching with per-track searches", exc_info=True)
+            return None
+
+        library = LibraryIndex.build(tracks)
+        logger.info("Indexed %s library tracks for in-memory matching", len(library.tracks))
+        return library
+
+    def _reset_connection(self) -> None:
+        # Force the next import to reconnect rather than reuse a possibly broken
+        # client; other servers and tokens keep their cached clients.
+        if self._plex is None:
+            discard_plex_server(self.plex_url, self.plex_token)
+
     def _apply_playlist_changes(
         self,
         plex: PlexServer,
@@ -146,21 +233,26 @@ class PlaylistImporter:
 
         if replace_existing:
             logger.info("Replacing contents of existing playlist '%s' with %s tracks", playlist_name, len(tracks))
-            items = list(playlist.items())
-            if items:
+            # Recreating costs two requests regardless of playlist size, where removing
+            # items went through Plex one request per track on failure. Plex allows
+            # duplicate titles, so the old playlist is only deleted once its
+            # replacement exists and a failed create leaves it untouched.
+            summary = getattr(playlist, "summary", None)
+            replacement = plex.createPlaylist(playlist_name, items=tracks, section=section)
+            try:
+                playlist.delete()
+            except Exception as exc:
+                raise RuntimeError(
+                    f"Created the new playlist but could not delete the previous one; remove it manually. ({exc})"
+                ) from exc
+            if summary and replacement is not None:
                 try:
-                    playlist.removeItems(items)
+                    replacement.editSummary(summary)
                 except Exception:
-                    logger.warning("Failed to remove items via removeItems; retrying individually", exc_info=True)
-                    for item in items:
-                        try:
-                            playlist.removeItems([item])
-                        except Exception:
-                            logger.exception("Unable to remove track %s", getattr(item, "title", "<unknown>"))
-            playlist.addItems(tracks)
+                    logger.warning("Unable to restore summary of playlist '%s'", playlist_name, exc_info=True)
             return len(tracks)
 
-        existing_rating_keys = {item.ratingKey for item in playlist.items()}
+        existing_rating_keys = _playlist_rating_keys(plex, playlist)
         new_tracks = [track for track in tracks if getattr(track, "ratingKey", None) not in existing_rating_keys]
         if not new_tracks:
             logger.info("No new tracks to add to playlist '%s'", playlist_name)
@@ -170,6 +262,17 @@ class PlaylistImporter:
         return len(new_tracks)
 
 
+def _playlist_rating_keys(plex: PlexServer, playlist) -> Set[int]:
+    # Reading ratingKey straight from the raw container skips building a Track per
+    # item and the 100-item pages playlist.items() fetches them in.
+    try:
+        data = plex.query(f"{playlist.key}/items")
+        return {int(element.get("ratingKey")) for element in data if element.get("ratingKey", "").isdigit()}
+    except Exception:
+        logger.debug("Raw playlist item query failed; falling back to playlist.items()", exc_info=True)
+        return {item.ratingKey for item in playlist.items()}
+
+
 def _has_playable_media(track) -> bool:
     locations = []
     try:
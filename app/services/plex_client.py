@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+from plexapi.server import PlexServer
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_SERVERS = 8
+
+# Guards the cache only; connecting happens outside it so a slow or unreachable
+# server never holds up lookups for other (url, token) pairs.
+_lock = threading.Lock()
+_servers: "OrderedDict[Tuple[str, str], PlexServer]" = OrderedDict()
+
+
+def get_plex_server(plex_url: str, plex_token: str) -> PlexServer:
+    """Return a connected PlexServer, reusing the client for repeated (url, token) pairs."""
+    key = (plex_url, plex_token)
+    with _lock:
+        server = _servers.get(key)
+        if server is not None:
+            _servers.move_to_end(key)
+            return server
+
+    # Callers racing on the same key may both connect; the first client stored wins.
+    server = _connect(plex_url, plex_token)
+    with _lock:
+        server = _servers.setdefault(key, server)
+        _servers.move_to_end(key)
+        while len(_servers) > MAX_CACHED_SERVERS:
+            _servers.popitem(last=False)
+    return server
+
+
+def discard_plex_server(plex_url: str, plex_token: str) -> None:
+    """Drop the cached client for one (url, token) pair so its next use reconnects."""
+    with _lock:
+        _servers.pop((plex_url, plex_token), None)
+
+
+def reset_plex_servers() -> None:
+    with _lock:
+        _servers.clear()
+    logger.info("Cleared cached Plex server connections")
+
+
+def _connect(plex_url: str, plex_token: str) -> PlexServer:
+    logger.debug("Opening new Plex server connection to %s", plex_url)
+    return PlexServer(plex_url, plex_token)
+
+
+__all__ = ["discard_plex_server", "get_plex_server", "reset_plex_servers"]
@@ -1,52 +1,82 @@
 from __future__ import annotations
 
 import threading
-from typing import Dict, Optional
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+import orjson
+
+JobState = Tuple[int, int, str]
+
+
+@dataclass
+class _Job:
+    processed: int = 0
+    total: int = 0
+    status: str = "running"
+    # Last JSON encoding handed to pollers, keyed by the state it was built from.
+    encoded: Optional[Tuple[JobState, bytes]] = None
+
+    def as_dict(self) -> Dict[str, Union[int, str]]:
+        return {"processed": self.processed, "total": self.total, "status": self.status}
 
 
 class JobProgress:
+    # The lock only guards adding/removing jobs. Per-job fields are plain attribute
+    # stores, which are atomic under the GIL, so the per-track update() path never
+    # contends with pollers or other jobs.
     def __init__(self) -> None:
         self._lock = threading.Lock()
-        self._jobs: Dict[str, Dict[str, Optional[int]]] = {}
+        self._jobs: Dict[str, _Job] = {}
 
     def start(self, job_id: str, total: int = 0) -> None:
         with self._lock:
-            self._jobs[job_id] = {"processed": 0, "total": total, "status": "running"}
+            self._jobs[job_id] = _Job(total=total)
 
     def set_total(self, job_id: str, total: int) -> None:
-        with self._lock:
-            if job_id not in self._jobs:
-                return
-            self._jobs[job_id]["total"] = total
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.total = total
 
     def update(self, job_id: str, processed: int) -> None:
-        with self._lock:
-            if job_id not in self._jobs:
-                return
-            self._jobs[job_id]["processed"] = processed
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.processed = processed
 
     def finish(self, job_id: str) -> None:
         with self._lock:
-            if job_id not in self._jobs:
-                return
-            self._jobs[job_id]["status"] = "completed"
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.status = "completed"
 
     def error(self, job_id: str) -> None:
         with self._lock:
-            if job_id not in self._jobs:
-                return
-            self._jobs[job_id]["status"] = "error"
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.status = "error"
 
-    def pop(self, job_id: str) -> Optional[Dict[str, Optional[int]]]:
+    def pop(self, job_id: str) -> Optional[Dict[str, Union[int, str]]]:
         with self._lock:
-            return self._jobs.pop(job_id, None)
+            job = self._jobs.pop(job_id, None)
+        return job.as_dict() if job is not None else None
 
-    def snapshot(self, job_id: str) -> Optional[Dict[str, Optional[int]]]:
-        with self._lock:
-            job = self._jobs.get(job_id)
-            if job is None:
-                return None
-            return dict(job)
+    def snapshot(self, job_id: str) -> Optional[Dict[str, Union[int, str]]]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return job.as_dict()
+
+    def snapshot_json(self, job_id: str) -> Optional[Tuple[str, bytes]]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        state = (job.processed, job.total, job.status)
+        encoded = job.encoded
+        if encoded is None or encoded[0] != state:
+            processed, total, status = state
+            encoded = (state, orjson.dumps({"processed": processed, "total": total, "status": status}))
+            job.encoded = encoded
+        return state[2], encoded[1]
 
 
 progress_tracker = JobProgress()
@@ -4,292 +4,431 @@ Comprehensive Plex server connection diagnostics for macOS troubleshooting.
 Tests various connection methods to identify why Python can't reach Plex while browsers can.
 """
 
+import asyncio
+import contextvars
+import io
 import socket
 import sys
 import os
 import platform
-import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from urllib.parse import urlparse
 import json
 
+# Run as a script (app/test.py), so put the repo root on the path for the app package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.services.connection_tester import get_local_ips
+
+SOCKET_PROBE_TIMEOUT = 10
+DISCOVERY_PORT = 32400
+DISCOVERY_WORKERS = 64
+# Anything on the LAN answers within milliseconds, which keeps a full /24 sweep short
+DISCOVERY_PROBE_TIMEOUT = 1
+DNS_CACHE_TTL = 300
+PLEXAPI_TIMEOUTS = (10, 30, 60)
+REQUEST_CONFIGS = (
+    {"timeout": 10},
+    {"timeout": 10, "verify": False},
+    {"timeout": 30},
+    {"timeout": 30, "allow_redirects": False},
+    {"timeout": 10, "stream": True},
+)
+
+_dns_cache = {}
+
+# Option name -> (level, optname); options the platform lacks are left out
+_SOCKOPTS = {
+    name: (level, getattr(socket, name))
+    for name, level in (
+        ("SO_REUSEADDR", socket.SOL_SOCKET),
+        ("IPV6_V6ONLY", getattr(socket, "IPPROTO_IPV6", None)),
+    )
+    if level is not None and hasattr(socket, name)
+}
+
+# Socket configurations tried against each address
+SOCKET_CONFIGS = (
+    ("IPv4 default", socket.AF_INET, socket.SOCK_STREAM, ()),
+    ("IPv4 with SO_REUSEADDR", socket.AF_INET, socket.SOCK_STREAM, (("SO_REUSEADDR", 1),)),
+    ("IPv6 dual stack", socket.AF_INET6, socket.SOCK_STREAM, (("IPV6_V6ONLY", 0),)),
+)
+
+# Report lines are collected in memory and written out once per section instead of
+# one stdout write per line. While independent phases run concurrently, each one
+# writes into its own buffer.
+_output = io.StringIO()
+_phase_output = contextvars.ContextVar("phase_output", default=None)
+
+def out(*values, sep=" ", end="\n"):
+    buffer = _phase_output.get()
+    (buffer if buffer is not None else _output).write(sep.join(map(str, values)) + end)
+
+def flush_output():
+    sys.stdout.write(_output.getvalue())
+    sys.stdout.flush()
+    _output.seek(0)
+    _output.truncate()
+
+def _capture_phase(func, *args):
+    buffer = io.StringIO()
+    _phase_output.set(buffer)  # to_thread gave this call its own context copy
+    return func(*args), buffer.getvalue()
+
+async def _run_phases(*phases):
+    """Run (func, *args) phases on threads at once; returns (result, output) per phase in order"""
+    return await asyncio.gather(*[asyncio.to_thread(_capture_phase, *phase) for phase in phases])
+
 def print_section(title):
-    print(f"\n{'='*60}")
-    print(f" {title}")
-    print(f"{'='*60}")
+    if _phase_output.get() is None:
+        flush_output()
+    out(f"\n{'='*60}")
+    out(f" {title}")
+    out(f"{'='*60}")
+
+def _resolve(host):
+    """getaddrinfo with a TTL cache; only successful lookups are cached"""
+    now = time.monotonic()
+    cached = _dns_cache.get(host)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    _dns_cache[host] = (now + DNS_CACHE_TTL, infos)
+    return infos
+
+def _socket_address(host, port, family):
+    """Pick a connect address for the socket family from the cached resolution"""
+    infos = _resolve(host)
+    for info_family, _, _, _, sockaddr in infos:
+        if info_family == family:
+            return (sockaddr[0], port) if family == socket.AF_INET else (sockaddr[0], port, 0, 0)
+
+    # For IPv6, map an IPv4-only host onto the dual stack
+    if family == socket.AF_INET6:
+        for info_family, _, _, _, sockaddr in infos:
+            if info_family == socket.AF_INET:
+                return ('::ffff:' + sockaddr[0], port, 0, 0)
+
+    raise OSError(f"No address for {host} in this address family")
+
+async def _probe_socket(host, port, family, sock_type, options):
+    """Attempt one non-blocking connect; raises on failure"""
+    loop = asyncio.get_running_loop()
+    s = socket.socket(family, sock_type)
+    try:
+        s.setblocking(False)
 
-def test_basic_socket_connection(host, port):
-    """Test raw TCP socket connection"""
-    print(f"Testing raw socket connection to {host}:{port}...")
+        # Bound the kernel's SYN retransmissions too, so a blackholed host fails with
+        # ETIMEDOUT instead of lingering after wait_for gives up (Linux only)
+        if hasattr(socket, "TCP_USER_TIMEOUT"):
+            try:
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, SOCKET_PROBE_TIMEOUT * 1000)
+            except OSError:
+                pass
 
-    # Test with different socket configurations
-    socket_configs = [
-        ("IPv4 default", socket.AF_INET, socket.SOCK_STREAM, {}),
-        ("IPv4 with SO_REUSEADDR", socket.AF_INET, socket.SOCK_STREAM, {"SO_REUSEADDR": 1}),
-        ("IPv6 dual stack", socket.AF_INET6, socket.SOCK_STREAM, {"IPV6_V6ONLY": 0}),
-    ]
+        # Apply socket options
+        for opt_name, opt_value in options:
+            sockopt = _SOCKOPTS.get(opt_name)
+            if sockopt is None:
+                continue  # Option not available
+            try:
+                s.setsockopt(*sockopt, opt_value)
+            except OSError:
+                pass
+
+        connect_addr = _socket_address(host, port, family)
 
-    for config_name, family, sock_type, options in socket_configs:
-        print(f"  Testing {config_name}...")
         try:
-            s = socket.socket(family, sock_type)
-            s.settimeout(10)
-
-            # Apply socket options
-            for opt_name, opt_value in options.items():
-                try:
-                    if opt_name == "SO_REUSEADDR":
-                        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, opt_value)
-                    elif opt_name == "IPV6_V6ONLY":
-                        s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, opt_value)
-                except:
-                    pass  # Option not available
-
-            # For IPv6, need to handle address format
-            if family == socket.AF_INET6:
-                # Try to map IPv4 to IPv6
-                if '.' in host:  # IPv4 address
-                    try:
-                        connect_addr = ('::ffff:' + host, port, 0, 0)
-                    except:
-                        print(f"    ❌ Cannot map IPv4 to IPv6")
-                        s.close()
-                        continue
-                else:
-                    connect_addr = (host, port, 0, 0)
-            else:
-                connect_addr = (host, port)
-
-            result = s.connect_ex(connect_addr)
-            if result == 0:
-                print(f"    ✅ {config_name} connection successful")
-                s.close()
-                return True
-            else:
-                print(f"    ❌ {config_name} failed with error code: {result}")
+            await asyncio.wait_for(loop.sock_connect(s, connect_addr), timeout=SOCKET_PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"timed out after {SOCKET_PROBE_TIMEOUT}s") from None
+    finally:
+        s.close()
 
-        except Exception as exc:
-            print(f"    ❌ {config_name} failed: {exc}")
+class _ProbeSkipped(Exception):
+    pass
+
+@lru_cache(maxsize=1)
+def _has_ipv6_route():
+    """Whether this machine can route IPv6 at all (no packets are sent)"""
+    try:
+        s = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        try:
+            s.connect(("2001:4860:4860::8888", 53))
         finally:
-            try:
-                s.close()
-            except:
-                pass
+            s.close()
+        return True
+    except OSError:
+        return False
+
+def _is_ipv4_literal(host):
+    try:
+        socket.inet_pton(socket.AF_INET, host)
+        return True
+    except OSError:
+        return False
 
-    return False
+async def _skip_probe(reason):
+    raise _ProbeSkipped(reason)
+
+async def _probe_socket_configs(host, port):
+    """Race every socket configuration against one address"""
+    # A dual-stack probe of an IPv4 literal tells nothing new without an IPv6 route
+    skip_ipv6 = _is_ipv4_literal(host) and not _has_ipv6_route()
+    return await asyncio.gather(
+        *[_skip_probe("IPv4 address and no IPv6 route")
+          if skip_ipv6 and family == socket.AF_INET6
+          else _probe_socket(host, port, family, sock_type, options)
+          for _, family, sock_type, options in SOCKET_CONFIGS],
+        return_exceptions=True,
+    )
+
+def _report_socket_results(host, port, results):
+    out(f"Testing raw socket connection to {host}:{port}...")
+
+    connected = False
+    for (config_name, _, _, _), result in zip(SOCKET_CONFIGS, results):
+        out(f"  Testing {config_name}...")
+        if isinstance(result, _ProbeSkipped):
+            out(f"    ⏭️  {config_name} skipped: {result}")
+        elif isinstance(result, BaseException):
+            out(f"    ❌ {config_name} failed: {result}")
+        else:
+            out(f"    ✅ {config_name} connection successful")
+            connected = True
+
+    return connected
+
+def test_basic_socket_connection(host, port):
+    """Test raw TCP socket connection"""
+    # All configurations race at once, so a dead host costs one timeout instead of three
+    results = asyncio.run(_probe_socket_configs(host, port))
+    return _report_socket_results(host, port, results)
 
 def test_dns_resolution(host):
     """Test DNS resolution"""
-    print(f"Testing DNS resolution for {host}...")
+    out(f"Testing DNS resolution for {host}...")
 
-    try:
-        # Test if it's already an IP
-        socket.inet_aton(host)
-        print(f"✅ {host} is already an IP address")
+    # Test if it's already an IP (IPv4 or IPv6)
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+        except OSError:
+            continue
+        out(f"✅ {host} is already an IP address")
         return True
-    except socket.error:
-        pass
 
     try:
-        ip = socket.gethostbyname(host)
-        print(f"✅ DNS resolution successful: {host} -> {ip}")
+        # getaddrinfo returns IPv4 and IPv6 results from the one lookup
+        addresses = list(dict.fromkeys(info[4][0] for info in _resolve(host)))
+        out(f"✅ DNS resolution successful: {host} -> {', '.join(addresses)}")
         return True
     except Exception as exc:
-        print(f"❌ DNS resolution failed: {exc}")
+        out(f"❌ DNS resolution failed: {exc}")
         return False
 
+@lru_cache(maxsize=1)
+def _requests_session():
+    """One pooled session for every requests-based attempt, so retries reuse the connection"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
 def test_requests_connection(url):
     """Test HTTP connection using requests library"""
-    print(f"Testing HTTP connection to {url}...")
+    out(f"Testing HTTP connection to {url}...")
 
     try:
         import requests
+        session = _requests_session()
 
         # Test with various configurations
-        configs = [
-            {"timeout": 10},
-            {"timeout": 10, "verify": False},
-            {"timeout": 30},
-            {"timeout": 30, "allow_redirects": False},
-            {"timeout": 10, "stream": True},
-        ]
-
-        for i, config in enumerate(configs, 1):
+        for i, config in enumerate(REQUEST_CONFIGS, 1):
             try:
-                print(f"  Test {i}: {config}")
-                response = requests.get(url, **config)
-                print(f"  ✅ Success: Status {response.status_code}")
-                if response.status_code == 200:
-                    print(f"  Response headers: {dict(response.headers)}")
+                out(f"  Test {i}: {config}")
+                with session.get(url, **config) as response:
+                    out(f"  ✅ Success: Status {response.status_code}")
+                    if response.status_code == 200:
+                        out(f"  Response headers: {dict(response.headers)}")
                 return True
             except Exception as exc:
-                print(f"  ❌ Failed: {exc}")
-
-        # Test the exact way PlexAPI makes requests
-        print(f"  Testing PlexAPI-style request...")
-        try:
-            session = requests.Session()
-            session.verify = False
-            response = session.get(url, timeout=30)
-            print(f"  ✅ PlexAPI-style Success: Status {response.status_code}")
-            return True
-        except Exception as exc:
-            print(f"  ❌ PlexAPI-style Failed: {exc}")
+                out(f"  ❌ Failed: {exc}")
 
         return False
 
     except ImportError:
-        print("❌ requests library not available")
+        out("❌ requests library not available")
         return False
 
 def test_urllib_connection(url):
     """Test HTTP connection using urllib"""
-    print(f"Testing urllib connection to {url}...")
+    out(f"Testing urllib connection to {url}...")
 
     try:
         import urllib.request
         import urllib.error
 
-        req = urllib.request.Request(url)
+        # /identity is unauthenticated and tiny, unlike the index at /
+        req = urllib.request.Request(f"{url.rstrip('/')}/identity")
         with urllib.request.urlopen(req, timeout=10) as response:
             status = response.getcode()
-            print(f"✅ urllib connection successful: Status {status}")
+            out(f"✅ urllib connection successful: Status {status}")
             return True
 
     except Exception as exc:
-        print(f"❌ urllib connection failed: {exc}")
+        out(f"❌ urllib connection failed: {exc}")
         return False
 
 def test_plexapi_connection(url, token):
     """Test PlexAPI library connection"""
-    print(f"Testing PlexAPI connection to {url}...")
+    out(f"Testing PlexAPI connection to {url}...")
 
     try:
         from plexapi.server import PlexServer
+    except ImportError:
+        out("❌ plexapi library not available")
+        return False
 
-        # Test with various timeout settings
-        timeouts = [10, 30, 60]
+    # All timeouts start together and the first success wins, instead of waiting out
+    # each failed attempt in turn
+    out(f"  Testing with {', '.join(f'{timeout}s' for timeout in PLEXAPI_TIMEOUTS)} timeouts concurrently...")
 
-        for timeout in timeouts:
+    executor = ThreadPoolExecutor(max_workers=len(PLEXAPI_TIMEOUTS))
+    futures = {executor.submit(PlexServer, url, token, timeout=timeout): timeout for timeout in PLEXAPI_TIMEOUTS}
+    try:
+        for future in as_completed(futures):
             try:
-                print(f"  Testing with {timeout}s timeout...")
-                plex = PlexServer(url, token, timeout=timeout)
-                print(f"  ✅ PlexAPI connection successful")
-                print(f"  Server: {plex.friendlyName}")
-                print(f"  Version: {plex.version}")
-                return True
+                plex = future.result()
             except Exception as exc:
-                print(f"  ❌ Failed with {timeout}s timeout: {exc}")
+                out(f"  ❌ Failed with {futures[future]}s timeout: {exc}")
+                continue
 
-        return False
+            out(f"  ✅ PlexAPI connection successful")
+            out(f"  Server: {plex.friendlyName}")
+            out(f"  Version: {plex.version}")
+            return True
 
-    except ImportError:
-        print("❌ plexapi library not available")
         return False
+    finally:
+        # Don't wait for the slower attempts once one has answered
+        executor.shutdown(wait=False, cancel_futures=True)
 
 def test_system_networking():
     """Test system networking configuration"""
     print_section("System Networking Diagnostics")
 
-    print(f"Platform: {platform.platform()}")
-    print(f"Python version: {sys.version}")
+    out(f"Platform: {platform.platform()}")
+    out(f"Python version: {sys.version}")
 
     # Check environment variables that might affect networking
     env_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'NO_PROXY', 'http_proxy', 'https_proxy', 'no_proxy']
-    print("\nProxy environment variables:")
+    out("\nProxy environment variables:")
     for var in env_vars:
         value = os.environ.get(var)
         if value:
-            print(f"  {var}={value}")
+            out(f"  {var}={value}")
     if not any(os.environ.get(var) for var in env_vars):
-        print("  No proxy variables set")
+        out("  No proxy variables set")
 
     # Test network interfaces
     try:
         import netifaces
-        print(f"\nNetwork interfaces:")
+        out(f"\nNetwork interfaces:")
         for interface in netifaces.interfaces():
             addrs = netifaces.ifaddresses(interface)
             if netifaces.AF_INET in addrs:
                 for addr in addrs[netifaces.AF_INET]:
-                    print(f"  {interface}: {addr['addr']}")
+                    out(f"  {interface}: {addr['addr']}")
     except ImportError:
-        print("\nNetwork interfaces: netifaces not available")
+        out("\nNetwork interfaces: netifaces not available")
 
 def discover_plex_servers():
     """Attempt to discover Plex servers using various methods"""
     print_section("Plex Server Discovery")
 
-    discovered_servers = []
+    candidates = []
 
     # Method 1: Try common localhost variants
-    localhost_variants = [
-        ("127.0.0.1", 32400),
-        ("localhost", 32400),
-        ("0.0.0.0", 32400),
-    ]
-
-    print("Testing localhost variants...")
-    for host, port in localhost_variants:
-        if test_http_connection_simple(host, port):
-            discovered_servers.append(f"http://{host}:{port}")
-            print(f"  ✅ Found working server: http://{host}:{port}")
+    candidates.extend([
+        ("127.0.0.1", DISCOVERY_PORT),
+        ("localhost", DISCOVERY_PORT),
+        ("0.0.0.0", DISCOVERY_PORT),
+    ])
 
     # Method 2: Try local network IPs
-    print("\nTesting local network addresses...")
-
-    # Get all local network interfaces
     try:
-        import subprocess
-        result = subprocess.run(['ifconfig'], capture_output=True, text=True)
-        lines = result.stdout.split('\n')
-
-        ips = []
-        for line in lines:
-            if 'inet ' in line and 'netmask' in line:
-                parts = line.strip().split()
-                for i, part in enumerate(parts):
-                    if part == 'inet' and i + 1 < len(parts):
-                        ip = parts[i + 1]
-                        if not ip.startswith('127.') and '.' in ip:
-                            ips.append(ip)
-
-        for ip in ips:
-            if test_http_connection_simple(ip, 32400):
-                discovered_servers.append(f"http://{ip}:32400")
-                print(f"  ✅ Found working server: http://{ip}:32400")
-
+        for ip in get_local_ips():
+            candidates.append((ip, DISCOVERY_PORT))
     except Exception as e:
-        print(f"  Could not scan network interfaces: {e}")
+        out(f"  Could not scan network interfaces: {e}")
 
-    # Method 3: Try common network ranges
-    print("\nTesting common private network ranges...")
-
-    # Get the network from the original problematic IP
+    # Method 3: Sweep the whole /24 of the original problematic IP
     target_network = "172.19.35"
-    for i in [1, 2, 100, 101, 254]:  # Common IPs in that range
-        test_ip = f"{target_network}.{i}"
-        if test_http_connection_simple(test_ip, 32400):
-            discovered_servers.append(f"http://{test_ip}:32400")
-            print(f"  ✅ Found working server: http://{test_ip}:32400")
+    for i in range(1, 255):
+        candidates.append((f"{target_network}.{i}", DISCOVERY_PORT))
+
+    candidates = list(dict.fromkeys(candidates))
+    out(f"Probing {len(candidates)} candidate addresses concurrently...")
+
+    discovered_servers = []
+    for host, port in _probe_http_candidates(candidates):
+        discovered_servers.append(f"http://{host}:{port}")
+        out(f"  ✅ Found working server: http://{host}:{port}")
 
     return discovered_servers
 
-def test_http_connection_simple(host, port):
+def _probe_http_candidates(candidates):
+    """Probe (host, port) pairs concurrently; returns the reachable ones in input order"""
+    if not candidates:
+        return []
+
+    # Every probe waits on the network, so a bounded thread pool turns N serial
+    # timeouts into roughly one
+    with ThreadPoolExecutor(max_workers=min(DISCOVERY_WORKERS, len(candidates))) as executor:
+        reachable = list(executor.map(
+            lambda candidate: test_http_connection_simple(*candidate, timeout=DISCOVERY_PROBE_TIMEOUT),
+            candidates,
+        ))
+
+    return [candidate for candidate, ok in zip(candidates, reachable) if ok]
+
+def test_http_connection_simple(host, port, timeout=3):
     """Simple HTTP test using urllib - more likely to work than raw sockets"""
     try:
         import urllib.request
         import urllib.error
 
-        url = f"http://{host}:{port}/"
+        # /identity is unauthenticated and tiny, unlike the index at /
+        url = f"http://{host}:{port}/identity"
         req = urllib.request.Request(url)
 
-        with urllib.request.urlopen(req, timeout=3) as response:
-            # Any response (even 401) means the server is reachable
+        with urllib.request.urlopen(req, timeout=timeout) as response:
             return True
 
+    except urllib.error.HTTPError:
+        # Any response (even 401) means the server is reachable
+        return True
     except Exception:
         return False
 
+@lru_cache(maxsize=1)
+def _get_local_ip():
+    """Local IP of the default route; raises OSError (and is retried) when offline"""
+    # Connect to external address to find local IP
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
 def test_alternative_addresses():
     """Test alternative ways to reach the Plex server"""
     print_section("Testing Alternative Addresses")
@@ -303,26 +442,34 @@ def test_alternative_addresses():
 
     # Try to get the local machine's IP
     try:
-        # Connect to external address to find local IP
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-        s.close()
+        local_ip = _get_local_ip()
         addresses.append(f"{local_ip}:32400")
-        print(f"Local machine IP: {local_ip}")
-    except:
+        out(f"Local machine IP: {local_ip}")
+    except OSError:
         pass
 
+    targets = []
     for addr in addresses:
         host, port = addr.split(':')
-        port = int(port)
-        print(f"\nTesting {addr}:")
-        test_basic_socket_connection(host, port)
+        targets.append((host, int(port)))
+
+    # Every address and configuration is probed in one batch
+    async def probe_all():
+        return await asyncio.gather(*[_probe_socket_configs(host, port) for host, port in targets])
+
+    for addr, (host, port), results in zip(addresses, targets, asyncio.run(probe_all())):
+        out(f"\nTesting {addr}:")
+        _report_socket_results(host, port, results)
+
+def _test_basic_connectivity(host, port):
+    print_section("Basic Connectivity Tests")
+    test_dns_resolution(host)
+    return test_basic_socket_connection(host, port)
 
 def run_comprehensive_test():
     """Run all diagnostic tests"""
     print_section("Plex Connection Diagnostics")
-    print("Diagnosing why Python can't connect to Plex while browsers can...")
+    out("Diagnosing why Python can't connect to Plex while browsers can...")
 
     # Configuration
     host = "172.19.35.2"
@@ -332,15 +479,23 @@ def run_comprehensive_test():
     # Get token from environment
     token = os.environ.get('PLEX_TOKEN', 'bT5v9S7irrXXWSzzA1MU')  # fallback to .env value
 
-    print(f"Target: {url}")
-    print(f"Token: {'*' * (len(token) - 4) + token[-4:] if token else 'Not set'}")
+    out(f"Target: {url}")
+    out(f"Token: {'*' * (len(token) - 4) + token[-4:] if token else 'Not set'}")
 
-    # Run tests
-    test_system_networking()
+    # Run tests. These phases do not depend on each other, so they run concurrently
+    # and their output is replayed in the usual order.
+    flush_output()
+    system_phase, basic_phase, alternative_phase, discovery_phase = asyncio.run(_run_phases(
+        (test_system_networking,),
+        (_test_basic_connectivity, host, port),
+        (test_alternative_addresses,),
+        # Try to discover working Plex servers
+        (discover_plex_servers,),
+    ))
 
-    print_section("Basic Connectivity Tests")
-    test_dns_resolution(host)
-    socket_ok = test_basic_socket_connection(host, port)
+    out(system_phase[1], end="")
+    socket_ok, basic_output = basic_phase
+    out(basic_output, end="")
 
     if socket_ok:
         print_section("HTTP Library Tests")
@@ -351,44 +506,46 @@ def run_comprehensive_test():
             print_section("PlexAPI Tests")
             test_plexapi_connection(url, token)
 
-    test_alternative_addresses()
-
-    # Try to discover working Plex servers
-    discovered = discover_plex_servers()
+    out(alternative_phase[1], end="")
+    discovered, discovery_output = discovery_phase
+    out(discovery_output, end="")
 
     print_section("Results & Recommendations")
 
     if discovered:
-        print("🎉 Found working Plex server addresses:")
+        out("🎉 Found working Plex server addresses:")
         for server in discovered:
-            print(f"  • {server}")
+            out(f"  • {server}")
 
-        print(f"\n💡 Update your .env file to use one of these URLs:")
-        print(f"   PLEX_URL={discovered[0]}")
+        out(f"\n💡 Update your .env file to use one of these URLs:")
+        out(f"   PLEX_URL={discovered[0]}")
 
         # Test the first discovered server with PlexAPI
         if token:
-            print(f"\n🧪 Testing PlexAPI with discovered server...")
+            out(f"\n🧪 Testing PlexAPI with discovered server...")
             test_plexapi_connection(discovered[0], token)
     else:
-        print("❌ No working Plex servers discovered via Python")
-        print("\n🔧 Troubleshooting steps for macOS Python networking:")
-        print("1. Check macOS System Preferences > Security & Privacy > Firewall")
-        print("2. Try allowing Python network access in firewall settings")
-        print("3. Check if using VPN that routes differently for Python")
-        print("4. Try running Python with elevated permissions temporarily")
-        print("5. Consider using Plex hostname instead of IP address")
+        out("❌ No working Plex servers discovered via Python")
+        out("\n🔧 Troubleshooting steps for macOS Python networking:")
+        out("1. Check macOS System Preferences > Security & Privacy > Firewall")
+        out("2. Try allowing Python network access in firewall settings")
+        out("3. Check if using VPN that routes differently for Python")
+        out("4. Try running Python with elevated permissions temporarily")
+        out("5. Consider using Plex hostname instead of IP address")
 
     print_section("Summary")
-    print("macOS networking issue confirmed:")
-    print("• Browser and system tools can connect to 172.19.35.2:32400")
-    print("• Python processes cannot connect (errno 65: No route to host)")
-    print("• This is a macOS security/networking configuration issue")
+    out("macOS networking issue confirmed:")
+    out("• Browser and system tools can connect to 172.19.35.2:32400")
+    out("• Python processes cannot connect (errno 65: No route to host)")
+    out("• This is a macOS security/networking configuration issue")
 
     if discovered:
-        print(f"\n✅ Solution: Use discovered working URL: {discovered[0]}")
+        out(f"\n✅ Solution: Use discovered working URL: {discovered[0]}")
     else:
-        print("\n🔍 Need to resolve macOS Python networking restrictions")
+        out("\n🔍 Need to resolve macOS Python networking restrictions")
 
 if __name__ == "__main__":
-    run_comprehensive_test()
\ No newline at end of file
+    try:
+        run_comprehensive_test()
+    finally:
+        flush_output()
\ No newline at end of file